@@ -20,6 +20,13 @@ public static class DownstreamApiEndpoint
     internal const string AuthenticatedRouteName = "DownstreamApi";
     internal const string UnauthenticatedRouteName = "DownstreamApiUnauthenticated";
 
+    // Response headers relayed in addition to the content headers, so callers can cache the result and
+    // revalidate it with optionsOverride.ExtraHeaderParameters.If-None-Match.
+    private static readonly string[] s_relayedResponseHeaders = ["Cache-Control", "ETag"];
+
+    internal static bool IsDownstreamApiRequest(PathString path) =>
+        path.StartsWithSegments("/" + AuthenticatedRouteName) || path.StartsWithSegments("/" + UnauthenticatedRouteName);
+
     public static void AddDownstreamApiRequestEndpoints(this WebApplication app)
     {
         app.MapPost("/DownstreamApi/{apiName}",
@@ -180,9 +187,18 @@ public static class DownstreamApiEndpoint
             responseContent = await downstreamResult.Content.ReadAsStringAsync(cancellationToken);
         }
 
+        var headers = new Dictionary<string, IEnumerable<string>>(downstreamResult.Content.Headers);
+        foreach (string headerName in s_relayedResponseHeaders)
+        {
+            if (downstreamResult.Headers.TryGetValues(headerName, out IEnumerable<string>? values))
+            {
+                headers[headerName] = values;
+            }
+        }
+
         var result = new DownstreamApiResult(
             (int)downstreamResult.StatusCode,
-            new Dictionary<string, IEnumerable<string>>(downstreamResult.Content.Headers),
+            headers,
             responseContent);
 
         return TypedResults.Ok(result);
@@ -57,6 +57,12 @@ public class Program
 
         builder.Services.AddHealthChecks();
 
+        // Downstream API payloads are relayed verbatim and can be large. Accept gzip/br/deflate request bodies
+        // and compress responses for callers that ask for it. Response compression keeps its default of being
+        // disabled over HTTPS, where compressing secret-bearing responses exposes them to BREACH-style attacks.
+        builder.Services.AddRequestDecompression();
+        builder.Services.AddResponseCompression();
+
         ConfigureAuthN(builder);
 
         builder.Services.AddAuthorization();
@@ -74,6 +80,15 @@ public class Program
             app.UseLocalCallerRestriction();
         }
 
+        // Only the downstream API endpoints carry payloads worth compressing.
+        app.UseWhen(
+            context => DownstreamApiEndpoint.IsDownstreamApiRequest(context.Request.Path),
+            downstreamApi =>
+            {
+                downstreamApi.UseRequestDecompression();
+                downstreamApi.UseResponseCompression();
+            });
+
         // Register auth explicitly so it runs after the loopback check.
         app.UseAuthentication();
         app.UseAuthorization();
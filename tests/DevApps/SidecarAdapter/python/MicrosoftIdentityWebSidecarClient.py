@@ -1,11 +1,41 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, Iterable, Mapping, MutableMapping, Optional, Sequence
+import copy
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 from urllib.parse import urljoin
 
 import requests
 
+try:
+    import brotli
+except ImportError:  # optional dependency, only needed for request_compression="br"
+    brotli = None
+
 
 JsonDict = Dict[str, Any]
 
@@ -94,6 +124,242 @@ class SidecarCallOptions:
     acquire_token_options: Optional[AcquireTokenOptions] = None
 
 
+# Headers of a 304 response that replace those of the cached result (RFC 9111, section 4.3.4).
+_REVALIDATED_HEADERS = frozenset({"cache-control", "etag", "expires"})
+
+
+class _CacheShard:
+    __slots__ = ("entries", "lock")
+
+    def __init__(self) -> None:
+        # key -> (result, expires_at, last_used); ordered from least to most recently used.
+        self.entries: "OrderedDict[Hashable, Tuple[DownstreamApiResult, float, int]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+
+class DownstreamApiResponseCache:
+    """Size-bounded LRU cache for idempotent (GET) downstream API results.
+
+    Freshness comes from the ``Cache-Control``/``Expires`` headers in the result, which the sidecar relays
+    together with ``ETag``: ``no-store`` responses are never cached. Once an entry is stale (immediately, for
+    ``no-cache``), it is kept only if it has an ``ETag``; the client then revalidates it with ``If-None-Match``
+    and keeps serving it on a ``304 Not Modified``. Responses without freshness information or an ``ETag`` are
+    only cached when ``default_ttl`` is set, which is an explicit opt-in to heuristic caching for that many
+    seconds.
+
+    Keys are spread over ``shards`` independently locked LRU segments so that concurrent threads rarely
+    wait on each other. The cache as a whole holds at most ``max_entries`` entries: once full, the least
+    recently used entry across all segments is evicted.
+    """
+
+    def __init__(self, *, max_entries: int = 256, default_ttl: float = 0.0, shards: int = 16) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be greater than zero")
+        if shards <= 0:
+            raise ValueError("shards must be greater than zero")
+        self._max_entries = max_entries
+        self._default_ttl = default_ttl
+        self._shards = tuple(_CacheShard() for _ in range(min(shards, max_entries)))
+        self._size = 0
+        self._size_lock = threading.Lock()
+        self._clock = itertools.count()
+        _FORK_AWARE_CACHES.add(self)
+
+    def __len__(self) -> int:
+        with self._size_lock:
+            return self._size
+
+    def get(self, key: Hashable) -> Optional[DownstreamApiResult]:
+        """Return the cached result for ``key`` if it is still fresh."""
+
+        result, fresh = self._lookup(key)
+        return result if fresh else None
+
+    def put(self, key: Hashable, result: DownstreamApiResult) -> None:
+        """Store ``result`` under ``key`` when its status and headers allow caching, otherwise drop ``key``."""
+
+        ttl = self._freshness_lifetime(result.headers)
+        storable = (
+            result.status_code == 200
+            and "no-store" not in _cache_directives(result.headers)
+            and (ttl > 0 or _get_header(result.headers, "ETag") is not None)
+        )
+        shard = self._shard(key)
+        with shard.lock:
+            existed = key in shard.entries
+            if storable:
+                shard.entries[key] = (result, time.monotonic() + ttl, next(self._clock))
+                shard.entries.move_to_end(key)
+            elif existed:
+                del shard.entries[key]
+        if storable and not existed and self._resize(1) > self._max_entries:
+            self._evict_overflow()
+        elif not storable and existed:
+            self._resize(-1)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                removed = len(shard.entries)
+                shard.entries.clear()
+            self._resize(-removed)
+
+    def _lookup(self, key: Hashable) -> Tuple[Optional[DownstreamApiResult], bool]:
+        """Return the cached result for ``key`` and whether it is fresh.
+
+        Stale entries are returned only when they have an ``ETag`` to revalidate with; others are dropped.
+        """
+
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                return None, False
+            result, expires_at, _ = entry
+            fresh = expires_at > time.monotonic()
+            dropped = not fresh and _get_header(result.headers, "ETag") is None
+            if dropped:
+                del shard.entries[key]
+            else:
+                shard.entries[key] = (result, expires_at, next(self._clock))
+                shard.entries.move_to_end(key)
+        if dropped:
+            self._resize(-1)
+            return None, False
+        return result, fresh
+
+    def _revalidated(
+        self, key: Hashable, cached: DownstreamApiResult, not_modified: DownstreamApiResult
+    ) -> DownstreamApiResult:
+        """Refresh ``cached`` with the validator and freshness headers of a 304 response and store it again."""
+
+        updated = {
+            name.lower(): (name, value)
+            for name, value in not_modified.headers.items()
+            if name.lower() in _REVALIDATED_HEADERS
+        }
+        headers = {name: value for name, value in cached.headers.items() if name.lower() not in updated}
+        headers.update(updated.values())
+        refreshed = replace(cached, headers=headers)
+        self.put(key, refreshed)
+        return refreshed
+
+    def _resize(self, delta: int) -> int:
+        with self._size_lock:
+            self._size += delta
+            return self._size
+
+    def _evict_overflow(self) -> None:
+        # Each segment is ordered by recency, so the global LRU entry is the oldest of the segment heads. Only one
+        # lock is held at a time; if a head changes between the scan and the pop, the scan is simply repeated.
+        while len(self) > self._max_entries:
+            oldest: Optional[Tuple[int, _CacheShard, Hashable]] = None
+            for shard in self._shards:
+                with shard.lock:
+                    if not shard.entries:
+                        continue
+                    key, (_, _, last_used) = next(iter(shard.entries.items()))
+                if oldest is None or last_used < oldest[0]:
+                    oldest = (last_used, shard, key)
+            if oldest is None:
+                return
+            last_used, shard, key = oldest
+            with shard.lock:
+                entry = shard.entries.get(key)
+                if entry is None or entry[2] != last_used:
+                    continue
+                del shard.entries[key]
+            self._resize(-1)
+
+    def _shard(self, key: Hashable) -> _CacheShard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _reinitialize_after_fork(self) -> None:
+        # A lock may have been held by another parent thread at fork time; entries are kept warm.
+        for shard in self._shards:
+            shard.lock = threading.Lock()
+        self._size_lock = threading.Lock()
+
+    def _freshness_lifetime(self, headers: Mapping[str, Any]) -> float:
+        directives = _cache_directives(headers)
+        if directives:
+            if "no-store" in directives or "no-cache" in directives:
+                return 0.0
+            for directive in directives:
+                name, _, value = directive.partition("=")
+                if name == "max-age":
+                    try:
+                        return float(value.strip('"'))
+                    except ValueError:
+                        return 0.0
+
+        expires = _get_header(headers, "Expires")
+        if expires:
+            try:
+                return parsedate_to_datetime(expires).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return 0.0
+
+        return self._default_ttl
+
+
+class _SessionPool:
+    """Per-thread ``requests.Session`` objects over one shared connection pool.
+
+    ``requests.Session`` is not documented as thread-safe, so every thread gets its own session, created on
+    first use. All of them mount the same transport adapter, whose urllib3 pool manager is itself locked, so
+    connections are reused across threads and ``pool_maxsize`` bounds the connections kept per host. A
+    caller-supplied session is used by every thread as-is: its thread-safety is then the caller's responsibility.
+    """
+
+    def __init__(self, session: Optional[requests.Session], adapter: Optional[requests.adapters.BaseAdapter]) -> None:
+        self._shared_session = session
+        self._adapter = adapter
+        self._local = threading.local()
+
+    def current(self) -> requests.Session:
+        """Return the calling thread's session."""
+
+        if self._shared_session is not None:
+            return self._shared_session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)  # type: ignore[arg-type]
+            session.mount("https://", self._adapter)  # type: ignore[arg-type]
+            self._local.session = session
+        return session
+
+    def probe_session(self) -> requests.Session:
+        """Return a session for background probes that shares the connection pools but no other state.
+
+        A caller-supplied session is not safe to use from several probe threads at once, so probes get a
+        private session mounted on the same adapters.
+        """
+
+        if self._shared_session is None:
+            return self.current()
+        session = requests.Session()
+        for prefix, adapter in self.adapters_by_prefix().items():
+            session.mount(prefix, adapter)
+        return session
+
+    def adapters(self) -> List[requests.adapters.BaseAdapter]:
+        return list(self.adapters_by_prefix().values())
+
+    def adapters_by_prefix(self) -> Mapping[str, requests.adapters.BaseAdapter]:
+        if self._shared_session is not None:
+            # Stand-ins for requests.Session (e.g. in tests) may not mount any adapters.
+            return getattr(self._shared_session, "adapters", {})
+        return {"http://": self._adapter, "https://": self._adapter}  # type: ignore[dict-item]
+
+    def close(self) -> None:
+        if self._shared_session is not None:
+            self._shared_session.close()
+        else:
+            self._adapter.close()  # type: ignore[union-attr]
+
+
 class SidecarError(Exception):
     """Raised when the sidecar returns an error response."""
 
@@ -104,7 +370,16 @@ class SidecarError(Exception):
 
 
 class MicrosoftIdentityWebSidecarClient:
-    """Client for the Microsoft.Identity.Web.Sidecar endpoints."""
+    """Client for the Microsoft.Identity.Web.Sidecar endpoints.
+
+    A single instance may be shared by many threads. Unless a ``session`` is supplied, each thread gets its own
+    ``requests.Session``, and all of them share one ``adapter`` (by default an ``HTTPAdapter`` pooling up to
+    ``pool_maxsize`` connections). Size ``pool_maxsize`` to the number of threads making calls: with more
+    threads than pooled connections, the extra connections are opened and then discarded (urllib3 logs
+    "Connection pool is full"), unless ``pool_block`` is set, in which case threads wait for a free connection.
+    Response caches guard their state with explicit locks. The client has not been validated on free-threaded
+    (no-GIL) Python builds.
+    """
 
     def __init__(
         self,
@@ -113,16 +388,59 @@ class MicrosoftIdentityWebSidecarClient:
         session: Optional[requests.Session] = None,
         default_headers: Optional[Mapping[str, str]] = None,
         timeout: Optional[float] = 30.0,
+        response_cache: Optional[DownstreamApiResponseCache] = None,
+        post_fork_warm_up_connections: int = 0,
+        request_compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        pool_maxsize: int = 32,
+        pool_block: bool = False,
+        adapter: Optional[requests.adapters.BaseAdapter] = None,
     ) -> None:
+        if session is not None and adapter is not None:
+            raise ValueError("Pass either a session or an adapter, not both.")
+        if request_compression is not None and request_compression not in supported_request_compressions():
+            raise ValueError(
+                f"Request compression '{request_compression}' is not available; "
+                f"supported encodings are {', '.join(supported_request_compressions())}."
+            )
         self._base_url = base_url.rstrip("/") + "/"
-        self._session = session or requests.Session()
+        if session is None and adapter is None:
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self._sessions = _SessionPool(session, adapter)
         self._owns_session = session is None
         self._default_headers: Dict[str, str] = dict(default_headers or {})
         self._timeout = timeout
+        self._response_cache = response_cache
+        self._post_fork_warm_up_connections = post_fork_warm_up_connections
+        self._request_compression = request_compression
+        self._compression_threshold = compression_threshold
+        _FORK_AWARE_CLIENTS.add(self)
 
     def close(self) -> None:
         if self._owns_session:
-            self._session.close()
+            self._sessions.close()
+
+    def warm_up(self, connections: int = 1) -> None:
+        """Open up to ``connections`` pooled connections by probing the sidecar health endpoint concurrently.
+
+        Failures are ignored: warming is best-effort and the connections are simply opened on first use instead.
+        Probes never use a caller-supplied ``session`` concurrently: they go through private sessions mounted
+        on its adapters.
+        """
+
+        # The probe sessions share the client's adapters, so the connections they open stay pooled.
+        probes = [
+            threading.Thread(
+                target=self._probe_health,
+                name="sidecar-warm-up",
+                daemon=True,
+            )
+            for _ in range(connections)
+        ]
+        for probe in probes:
+            probe.start()
+        for probe in probes:
+            probe.join()
 
     def __enter__(self) -> "MicrosoftIdentityWebSidecarClient":
         return self
@@ -186,14 +504,13 @@ class MicrosoftIdentityWebSidecarClient:
         json_body: Any = None,
     ) -> DownstreamApiResult:
         params = self._build_query_parameters(agent_identity, agent_username, agent_user_id, options)
-        response_data = self._send_json(
-            method="POST",
+        return self._invoke_downstream(
             path=f"DownstreamApi/{api_name}",
             headers={"Authorization": authorization_header},
             params=params,
-            json=json_body,
+            options=options,
+            json_body=json_body,
         )
-        return DownstreamApiResult.from_dict(response_data)
 
     def invoke_downstream_api_unauthenticated(
         self,
@@ -206,25 +523,189 @@ class MicrosoftIdentityWebSidecarClient:
         json_body: Any = None,
     ) -> DownstreamApiResult:
         params = self._build_query_parameters(agent_identity, agent_username, agent_user_id, options)
-        response_data = self._send_json(
-            method="POST",
+        return self._invoke_downstream(
             path=f"DownstreamApiUnauthenticated/{api_name}",
+            headers=None,
             params=params,
-            json=json_body,
+            options=options,
+            json_body=json_body,
+        )
+
+    def iter_downstream_api_items(
+        self,
+        api_name: str,
+        authorization_header: str,
+        *,
+        downstream_base_url: str,
+        agent_identity: Optional[str] = None,
+        agent_username: Optional[str] = None,
+        agent_user_id: Optional[str] = None,
+        options: Optional[SidecarCallOptions] = None,
+        items_key: str = "value",
+        next_link_key: str = "@odata.nextLink",
+        max_buffered_pages: int = 1,
+    ) -> Iterator[Any]:
+        """Yield the items of a paged downstream API, following next links across pages.
+
+        Upcoming pages are fetched in the background while the caller processes the current one. Besides the
+        page being consumed, at most ``max_buffered_pages`` pages are held (queued or being fetched). Absolute
+        next links are turned into ``relative_path`` overrides by stripping ``downstream_base_url`` (the
+        downstream API's configured base URL), because the sidecar never honours ``BaseUrl`` overrides. A next
+        link that does not advance, e.g. because the sidecar ignores ``RelativePath`` overrides, raises
+        :class:`SidecarError` instead of looping over the same page.
+        """
+
+        def fetch(page_options: Optional[SidecarCallOptions]) -> DownstreamApiResult:
+            return self.invoke_downstream_api(
+                api_name,
+                authorization_header,
+                agent_identity=agent_identity,
+                agent_username=agent_username,
+                agent_user_id=agent_user_id,
+                options=page_options,
+            )
+
+        return _iter_paged_items(
+            fetch, options, downstream_base_url, items_key, next_link_key, max_buffered_pages
+        )
+
+    def iter_downstream_api_items_unauthenticated(
+        self,
+        api_name: str,
+        *,
+        downstream_base_url: str,
+        agent_identity: Optional[str] = None,
+        agent_username: Optional[str] = None,
+        agent_user_id: Optional[str] = None,
+        options: Optional[SidecarCallOptions] = None,
+        items_key: str = "value",
+        next_link_key: str = "@odata.nextLink",
+        max_buffered_pages: int = 1,
+    ) -> Iterator[Any]:
+        """Unauthenticated counterpart of :meth:`iter_downstream_api_items`."""
+
+        def fetch(page_options: Optional[SidecarCallOptions]) -> DownstreamApiResult:
+            return self.invoke_downstream_api_unauthenticated(
+                api_name,
+                agent_identity=agent_identity,
+                agent_username=agent_username,
+                agent_user_id=agent_user_id,
+                options=page_options,
+            )
+
+        return _iter_paged_items(
+            fetch, options, downstream_base_url, items_key, next_link_key, max_buffered_pages
         )
-        return DownstreamApiResult.from_dict(response_data)
 
     def with_default_authorization(self, authorization_header: str) -> "MicrosoftIdentityWebSidecarClient":
         """Return a new client instance that always sends the given Authorization header."""
 
-        headers = dict(self._default_headers)
-        headers["Authorization"] = authorization_header
-        return MicrosoftIdentityWebSidecarClient(
-            self._base_url,
-            session=self._session,
-            default_headers=headers,
-            timeout=self._timeout,
+        # A shallow copy shares this client's sessions, connection pool and cache instead of creating new ones.
+        client = copy.copy(self)
+        client._default_headers = dict(self._default_headers)
+        client._default_headers["Authorization"] = authorization_header
+        # Closing the derived client must not close the shared pool, and the parent already warms it after a fork.
+        client._owns_session = False
+        client._post_fork_warm_up_connections = 0
+        _FORK_AWARE_CLIENTS.add(client)
+        return client
+
+    def _invoke_downstream(
+        self,
+        *,
+        path: str,
+        headers: Optional[Mapping[str, str]],
+        params: Mapping[str, Any],
+        options: Optional[SidecarCallOptions],
+        json_body: Any,
+    ) -> DownstreamApiResult:
+        cache_key = self._downstream_cache_key(path, headers, params, options, json_body)
+        cached: Optional[DownstreamApiResult] = None
+        if cache_key is not None:
+            cached, fresh = self._response_cache._lookup(cache_key)  # type: ignore[union-attr]
+            if fresh:
+                return cached  # type: ignore[return-value]
+            if cached is not None:
+                # The sidecar forwards ExtraHeaderParameters to the downstream API when overrides are allowed;
+                # otherwise the header is dropped and a full 200 response simply replaces the entry.
+                params = dict(params)
+                params["optionsOverride.ExtraHeaderParameters.If-None-Match"] = _get_header(cached.headers, "ETag")
+
+        response_data = self._send_json(
+            method="POST",
+            path=path,
+            headers=headers,
+            params=params,
+            json=json_body,
+        )
+        result = DownstreamApiResult.from_dict(response_data)
+
+        if cache_key is not None:
+            if result.status_code == 304 and cached is not None:
+                return self._response_cache._revalidated(cache_key, cached, result)  # type: ignore[union-attr]
+            self._response_cache.put(cache_key, result)  # type: ignore[union-attr]
+        return result
+
+    def _downstream_cache_key(
+        self,
+        path: str,
+        headers: Optional[Mapping[str, str]],
+        params: Mapping[str, Any],
+        options: Optional[SidecarCallOptions],
+        json_body: Any,
+    ) -> Optional[Hashable]:
+        """Build the response cache key, or return ``None`` when the call must not be cached."""
+
+        if self._response_cache is None or json_body is not None:
+            return None
+        if options is None or (options.http_method or "").upper() != "GET":
+            return None
+
+        # The caller identity is part of the key so results are never shared across users. Hash it
+        # to avoid keeping bearer tokens alive in the cache keys.
+        authorization = (headers or {}).get("Authorization") or self._default_headers.get("Authorization") or ""
+        caller = hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+        frozen_params = tuple(
+            sorted(
+                (key, tuple(value) if isinstance(value, list) else value)
+                for key, value in params.items()
+            )
         )
+        return (urljoin(self._base_url, path), caller, frozen_params)
+
+    def _probe_health(self) -> None:
+        try:
+            session = self._sessions.probe_session()
+            response = session.get(urljoin(self._base_url, "healthz"), timeout=self._timeout)
+            # Reading the body releases the connection back to the pool.
+            response.content
+        except requests.RequestException:
+            pass
+
+    def _reinitialize_after_fork(self, reset_adapters: MutableMapping[int, requests.adapters.BaseAdapter]) -> None:
+        # Sockets inherited from the parent are shared with it, so the child must never send on them. Give every
+        # adapter a fresh pool manager while keeping the session configuration (headers, auth, mounts) intact.
+        # The old pool manager is dropped; when it is garbage-collected urllib3 closes the inherited connections,
+        # which only releases the child's copies of the descriptors (no shutdown), so the parent is unaffected.
+        for adapter in self._sessions.adapters():
+            if id(adapter) in reset_adapters:
+                continue
+            reset_adapters[id(adapter)] = adapter
+            if isinstance(adapter, requests.adapters.HTTPAdapter):
+                adapter.init_poolmanager(
+                    adapter._pool_connections,  # type: ignore[attr-defined]
+                    adapter._pool_maxsize,  # type: ignore[attr-defined]
+                    block=adapter._pool_block,  # type: ignore[attr-defined]
+                )
+                adapter.proxy_manager = {}
+
+        if self._post_fork_warm_up_connections > 0:
+            threading.Thread(
+                target=self.warm_up,
+                args=(self._post_fork_warm_up_connections,),
+                name="sidecar-post-fork-warm-up",
+                daemon=True,
+            ).start()
 
     def _build_query_parameters(
         self,
@@ -324,12 +805,22 @@ class MicrosoftIdentityWebSidecarClient:
 
         prepared_params = _prepare_params(params)
 
-        response = self._session.request(
+        data: Optional[bytes] = None
+        if json is not None:
+            data = _encode_json_body(json)
+            request_headers["Content-Type"] = "application/json"
+            if self._request_compression is not None and len(data) >= self._compression_threshold:
+                data = _compress(self._request_compression, data)
+                request_headers["Content-Encoding"] = self._request_compression
+
+        # The sidecar compresses /DownstreamApi responses for encodings advertised in the session's default
+        # Accept-Encoding (gzip, plus br when brotli is installed); urllib3 decodes them incrementally as read.
+        response = self._sessions.current().request(
             method=method,
             url=url,
             headers=request_headers,
             params=prepared_params,
-            json=json,
+            data=data,
             timeout=self._timeout,
         )
         if response.status_code >= 400:
@@ -364,5 +855,174 @@ def _prepare_params(params: Optional[Mapping[str, Any]]) -> Optional[Mapping[str
     return prepared
 
 
+_FORK_AWARE_CLIENTS: "weakref.WeakSet[MicrosoftIdentityWebSidecarClient]" = weakref.WeakSet()
+_FORK_AWARE_CACHES: "weakref.WeakSet[DownstreamApiResponseCache]" = weakref.WeakSet()
+
+
+def _reinitialize_after_fork() -> None:
+    for cache in list(_FORK_AWARE_CACHES):
+        cache._reinitialize_after_fork()
+    # Clients created through with_default_authorization share an adapter; reset each adapter once.
+    reset_adapters: Dict[int, requests.adapters.BaseAdapter] = {}
+    for client in list(_FORK_AWARE_CLIENTS):
+        client._reinitialize_after_fork(reset_adapters)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinitialize_after_fork)
+
+
+_END_OF_PAGES = object()
+
+
+def _iter_paged_items(
+    fetch: Callable[[Optional[SidecarCallOptions]], DownstreamApiResult],
+    options: Optional[SidecarCallOptions],
+    downstream_base_url: str,
+    items_key: str,
+    next_link_key: str,
+    max_buffered_pages: int,
+) -> Iterator[Any]:
+    if max_buffered_pages <= 0:
+        raise ValueError("max_buffered_pages must be greater than zero")
+    if not downstream_base_url:
+        raise ValueError("downstream_base_url is required to follow absolute next links")
+
+    pages: "queue.Queue[Any]" = queue.Queue()
+    # One slot per page the producer may hold ahead of the consumer, whether queued or still being fetched.
+    # A slot is taken before a fetch starts and given back when the consumer picks the page up.
+    slots = threading.Semaphore(max_buffered_pages)
+    stopped = threading.Event()
+
+    def take_slot() -> bool:
+        while not stopped.is_set():
+            if slots.acquire(timeout=0.1):
+                return True
+        return False
+
+    def produce() -> None:
+        page_options = options
+        visited = {options.relative_path if options else None}
+        try:
+            while take_slot():
+                result = fetch(page_options)
+                page = _parse_page(result)
+                next_link = page.get(next_link_key)
+                relative_path = _to_relative_path(next_link, downstream_base_url) if next_link else None
+                if relative_path is not None and relative_path in visited:
+                    # Typically the sidecar ignoring the RelativePath override (AllowOverrides disabled) and
+                    # returning the same page again; stop before yielding duplicates.
+                    raise SidecarError(
+                        result.status_code,
+                        f"Downstream API next link '{next_link}' does not advance; "
+                        "check that the sidecar allows RelativePath overrides for this endpoint.",
+                    )
+                pages.put(page.get(items_key) or [])
+                if relative_path is None:
+                    break
+                visited.add(relative_path)
+                if page_options is None:
+                    page_options = SidecarCallOptions(relative_path=relative_path)
+                else:
+                    page_options = replace(page_options, relative_path=relative_path)
+        except BaseException as exc:  # surfaced to the consumer thread
+            pages.put(exc)
+            return
+        pages.put(_END_OF_PAGES)
+
+    def consume() -> Iterator[Any]:
+        producer = threading.Thread(target=produce, name="sidecar-page-prefetch", daemon=True)
+        producer.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is _END_OF_PAGES:
+                    return
+                if isinstance(page, BaseException):
+                    raise page
+                slots.release()
+                yield from page
+                # Drop the finished page before blocking on the next one.
+                del page
+        finally:
+            stopped.set()
+
+    return consume()
+
+
+def _parse_page(result: DownstreamApiResult) -> Mapping[str, Any]:
+    if result.status_code >= 400:
+        raise SidecarError(result.status_code, f"Downstream API returned status code {result.status_code}")
+    content = result.content
+    if content is None or content == "":
+        return {}
+    if isinstance(content, (str, bytes)):
+        try:
+            content = json.loads(content)
+        except ValueError as exc:
+            raise SidecarError(result.status_code, "Expected JSON page from downstream API") from exc
+    if not isinstance(content, Mapping):
+        raise SidecarError(result.status_code, "Expected a JSON object page from downstream API")
+    return content
+
+
+def _to_relative_path(next_link: str, downstream_base_url: str) -> str:
+    if "://" not in next_link:
+        return next_link
+    base = downstream_base_url.rstrip("/") + "/"
+    if next_link.startswith(base):
+        return next_link[len(base):]
+    raise ValueError(
+        f"Cannot map next link '{next_link}' to a relative path; it is not under downstream_base_url "
+        f"'{downstream_base_url}'."
+    )
+
+
+def supported_request_compressions() -> Tuple[str, ...]:
+    """Request body encodings available to ``request_compression``.
+
+    These are the encodings the sidecar's request decompression accepts (gzip and, with the optional ``brotli``
+    package installed, br).
+    """
+
+    if brotli is not None:
+        return ("gzip", "br")
+    return ("gzip",)
+
+
+def _encode_json_body(value: Any) -> bytes:
+    # Same encoding requests uses for json=, minus the insignificant whitespace.
+    return json.dumps(value, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def _compress(encoding: str, data: bytes) -> bytes:
+    # Mid-range levels: most of the size reduction at a fraction of the CPU cost of the maximum levels.
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    raise ValueError(f"Unsupported request compression '{encoding}'.")
+
+
 def _to_bool_str(value: bool) -> str:
     return "true" if value else "false"
+
+
+def _cache_directives(headers: Mapping[str, Any]) -> List[str]:
+    cache_control = _get_header(headers, "Cache-Control")
+    if not cache_control:
+        return []
+    return [directive.strip().lower() for directive in cache_control.split(",")]
+
+
+def _get_header(headers: Mapping[str, Any], name: str) -> Optional[str]:
+    """Case-insensitive header lookup; the sidecar relays multi-valued headers as lists."""
+
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() != lowered:
+            continue
+        if isinstance(value, (list, tuple)):
+            return ", ".join(str(item) for item in value)
+        return str(value)
+    return None
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import threading
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+import requests
+
+from MicrosoftIdentityWebSidecarClient import (
+    AuthorizationHeaderResult,
+    MicrosoftIdentityWebSidecarClient,
+    SidecarCallOptions,
+    SidecarError,
+    ValidateAuthorizationHeaderResult,
+)
+
+
+DEFAULT_CONTEXT_KEY = "identity.sidecar"
+
+_logger = logging.getLogger(__name__)
+
+
+class SidecarRequestContext:
+    """Per-request view of the sidecar: the validated caller plus memoized downstream headers."""
+
+    def __init__(
+        self,
+        client: MicrosoftIdentityWebSidecarClient,
+        authorization_header: str,
+        validation: ValidateAuthorizationHeaderResult,
+    ) -> None:
+        self.client = client
+        self.authorization_header = authorization_header
+        self.validation = validation
+        self._headers: Dict[Hashable, AuthorizationHeaderResult] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def claims(self) -> Mapping[str, Any]:
+        return self.validation.claims
+
+    def get_authorization_header(
+        self,
+        api_name: str,
+        *,
+        agent_identity: Optional[str] = None,
+        agent_username: Optional[str] = None,
+        agent_user_id: Optional[str] = None,
+        options: Optional[SidecarCallOptions] = None,
+    ) -> AuthorizationHeaderResult:
+        """Return the downstream Authorization header, calling the sidecar at most once per request.
+
+        Only successful results are memoized; a failed call is retried by the next lookup.
+        """
+
+        key = _memo_key(api_name, agent_identity, agent_username, agent_user_id, options)
+        with self._lock:
+            cached = self._headers.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.client.get_authorization_header(
+            api_name,
+            self.authorization_header,
+            agent_identity=agent_identity,
+            agent_username=agent_username,
+            agent_user_id=agent_user_id,
+            options=options,
+        )
+        with self._lock:
+            return self._headers.setdefault(key, result)
+
+
+class AsyncSidecarRequestContext:
+    """ASGI counterpart of :class:`SidecarRequestContext`.
+
+    Sidecar calls run in the event loop's default executor so they never block the loop, and concurrent
+    awaits for the same downstream header share a single in-flight call.
+    """
+
+    def __init__(
+        self,
+        client: MicrosoftIdentityWebSidecarClient,
+        authorization_header: str,
+        validation: ValidateAuthorizationHeaderResult,
+    ) -> None:
+        self.client = client
+        self.authorization_header = authorization_header
+        self.validation = validation
+        self._headers: Dict[Hashable, "asyncio.Future[AuthorizationHeaderResult]"] = {}
+
+    @property
+    def claims(self) -> Mapping[str, Any]:
+        return self.validation.claims
+
+    async def get_authorization_header(
+        self,
+        api_name: str,
+        *,
+        agent_identity: Optional[str] = None,
+        agent_username: Optional[str] = None,
+        agent_user_id: Optional[str] = None,
+        options: Optional[SidecarCallOptions] = None,
+    ) -> AuthorizationHeaderResult:
+        """Return the downstream Authorization header, calling the sidecar at most once per request.
+
+        Only successful results are memoized; a failed call is retried by the next lookup.
+        """
+
+        key = _memo_key(api_name, agent_identity, agent_username, agent_user_id, options)
+        pending = self._headers.get(key)
+        if pending is None:
+            pending = asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    self.client.get_authorization_header,
+                    api_name,
+                    self.authorization_header,
+                    agent_identity=agent_identity,
+                    agent_username=agent_username,
+                    agent_user_id=agent_user_id,
+                    options=options,
+                ),
+            )
+            self._headers[key] = pending
+        try:
+            return await asyncio.shield(pending)
+        except Exception:
+            # Don't memoize failures (sidecar or transport errors); a later lookup in the same request retries.
+            # Cancellation of this awaiter is not a failure of the shared call, so it is left in place.
+            if self._headers.get(key) is pending:
+                del self._headers[key]
+            raise
+
+
+WsgiStartResponse = Callable[..., Any]
+WsgiApp = Callable[[Dict[str, Any], WsgiStartResponse], Iterable[bytes]]
+
+
+class SidecarWsgiMiddleware:
+    """WSGI middleware that validates the caller's Authorization header once per request.
+
+    On success a :class:`SidecarRequestContext` is stored in ``environ[context_key]``. Requests without an
+    Authorization header are rejected with 401 unless ``require_authentication`` is false, in which case the
+    context is ``None``. Headers the sidecar rejects get a 401; sidecar or transport failures get a 502.
+    """
+
+    def __init__(
+        self,
+        app: WsgiApp,
+        client: MicrosoftIdentityWebSidecarClient,
+        *,
+        context_key: str = DEFAULT_CONTEXT_KEY,
+        require_authentication: bool = True,
+    ) -> None:
+        self._app = app
+        self._client = client
+        self._context_key = context_key
+        self._require_authentication = require_authentication
+
+    def __call__(self, environ: Dict[str, Any], start_response: WsgiStartResponse) -> Iterable[bytes]:
+        authorization_header = environ.get("HTTP_AUTHORIZATION")
+        if not authorization_header:
+            if self._require_authentication:
+                return _wsgi_problem(start_response, 401, "Missing Authorization header.")
+            environ[self._context_key] = None
+            return self._app(environ, start_response)
+
+        try:
+            validation = self._client.validate_authorization_header(authorization_header)
+        except (SidecarError, requests.RequestException) as error:
+            return _wsgi_problem(start_response, *_validation_failure(error))
+
+        environ[self._context_key] = SidecarRequestContext(self._client, authorization_header, validation)
+        return self._app(environ, start_response)
+
+
+AsgiReceive = Callable[[], Awaitable[Dict[str, Any]]]
+AsgiSend = Callable[[Dict[str, Any]], Awaitable[None]]
+AsgiApp = Callable[[Dict[str, Any], AsgiReceive, AsgiSend], Awaitable[None]]
+
+
+class SidecarAsgiMiddleware:
+    """ASGI middleware that validates the caller's Authorization header once per HTTP request or WebSocket.
+
+    On success an :class:`AsyncSidecarRequestContext` is stored in ``scope[context_key]``. Validation runs in
+    the event loop's default executor and failures are reported as in :class:`SidecarWsgiMiddleware`. A rejected
+    WebSocket handshake gets the same problem response when the server supports the ``websocket.http.response``
+    extension, and is otherwise closed before it is accepted (servers answer 403). Other scopes (``lifespan``)
+    are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        app: AsgiApp,
+        client: MicrosoftIdentityWebSidecarClient,
+        *,
+        context_key: str = DEFAULT_CONTEXT_KEY,
+        require_authentication: bool = True,
+    ) -> None:
+        self._app = app
+        self._client = client
+        self._context_key = context_key
+        self._require_authentication = require_authentication
+
+    async def __call__(self, scope: Dict[str, Any], receive: AsgiReceive, send: AsgiSend) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self._app(scope, receive, send)
+            return
+
+        authorization_header = _asgi_header(scope, b"authorization")
+        if not authorization_header:
+            if self._require_authentication:
+                await _asgi_problem(scope, send, 401, "Missing Authorization header.")
+                return
+            scope[self._context_key] = None
+            await self._app(scope, receive, send)
+            return
+
+        try:
+            validation = await asyncio.get_running_loop().run_in_executor(
+                None, self._client.validate_authorization_header, authorization_header
+            )
+        except (SidecarError, requests.RequestException) as error:
+            await _asgi_problem(scope, send, *_validation_failure(error))
+            return
+
+        scope[self._context_key] = AsyncSidecarRequestContext(self._client, authorization_header, validation)
+        await self._app(scope, receive, send)
+
+
+def _memo_key(
+    api_name: str,
+    agent_identity: Optional[str],
+    agent_username: Optional[str],
+    agent_user_id: Optional[str],
+    options: Optional[SidecarCallOptions],
+) -> Hashable:
+    # SidecarCallOptions may hold unhashable sequences (scopes); its dataclass repr is a stable stand-in.
+    return (api_name, agent_identity, agent_username, agent_user_id, repr(options))
+
+
+def _validation_failure(error: Exception) -> Tuple[int, str]:
+    """Map a failed /Validate call to the status and detail returned to the end client.
+
+    The sidecar's own status and detail describe the sidecar (e.g. a 403 from its loopback restriction or a 500),
+    not the caller, so they are logged rather than echoed.
+    """
+
+    if isinstance(error, SidecarError) and error.status_code in (400, 401):
+        return 401, "The Authorization header is not valid."
+    _logger.warning("Sidecar token validation failed: %s", error)
+    return 502, "The authentication service is unavailable."
+
+
+def _problem_body(status_code: int, detail: str) -> bytes:
+    problem = {"title": _reason(status_code), "status": status_code, "detail": detail}
+    return json.dumps(problem).encode("utf-8")
+
+
+def _problem_headers(status_code: int, body: bytes) -> List[Tuple[str, str]]:
+    headers = [("Content-Type", "application/problem+json"), ("Content-Length", str(len(body)))]
+    if status_code == 401:
+        headers.append(("WWW-Authenticate", "Bearer"))
+    return headers
+
+
+def _wsgi_problem(start_response: WsgiStartResponse, status_code: int, detail: str) -> Iterable[bytes]:
+    body = _problem_body(status_code, detail)
+    start_response(f"{status_code} {_reason(status_code)}", _problem_headers(status_code, body))
+    return [body]
+
+
+async def _asgi_problem(scope: Mapping[str, Any], send: AsgiSend, status_code: int, detail: str) -> None:
+    if scope["type"] == "websocket":
+        if "websocket.http.response" not in (scope.get("extensions") or {}):
+            # 1008: policy violation. Closing before accepting makes the server deny the handshake.
+            await send({"type": "websocket.close", "code": 1008, "reason": detail})
+            return
+        prefix = "websocket."
+    else:
+        prefix = ""
+
+    body = _problem_body(status_code, detail)
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in _problem_headers(status_code, body)
+    ]
+    await send({"type": f"{prefix}http.response.start", "status": status_code, "headers": headers})
+    await send({"type": f"{prefix}http.response.body", "body": body})
+
+
+def _asgi_header(scope: Mapping[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _reason(status_code: int) -> str:
+    try:
+        return HTTPStatus(status_code).phrase
+    except ValueError:
+        return "Error"
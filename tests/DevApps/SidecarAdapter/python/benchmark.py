@@ -0,0 +1,439 @@
+import argparse
+import asyncio
+import functools
+import gzip
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+try:
+    import brotli
+except ImportError:  # optional dependency, only needed to decode br request bodies
+    brotli = None
+
+from MicrosoftIdentityWebSidecarClient import (
+    DownstreamApiResponseCache,
+    MicrosoftIdentityWebSidecarClient,
+    SidecarCallOptions,
+    supported_request_compressions,
+)
+from MicrosoftIdentityWebSidecarMiddleware import (
+    DEFAULT_CONTEXT_KEY,
+    SidecarAsgiMiddleware,
+    SidecarWsgiMiddleware,
+)
+
+
+AUTHORIZATION_HEADER = "Bearer benchmark-token"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for the Python sidecar client, run against a local stub sidecar.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    middleware_parser = subparsers.add_parser(
+        "middleware",
+        help="Compare hand-written per-handler sidecar calls with the WSGI/ASGI middleware.",
+    )
+    middleware_parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+    middleware_parser.add_argument(
+        "--header-lookups",
+        type=int,
+        default=3,
+        help="Downstream Authorization header lookups performed by each request.",
+    )
+
+    compression_parser = subparsers.add_parser(
+        "compression",
+        help="Compare CPU cost and bytes on the wire for each request and response compression encoding.",
+    )
+    compression_parser.add_argument("--requests", type=int, default=200, help="Requests per encoding.")
+    compression_parser.add_argument(
+        "--items", type=int, default=2000, help="Items in the JSON request body and in the downstream response."
+    )
+    compression_parser.add_argument(
+        "--threshold",
+        type=int,
+        default=1024,
+        help="compression_threshold passed to the client.",
+    )
+
+    contention_parser = subparsers.add_parser(
+        "contention",
+        help="Measure throughput of one shared client as the number of threads grows.",
+    )
+    contention_parser.add_argument(
+        "--threads",
+        default="1,2,4,8,16,32,64,128,200",
+        help="Comma-separated thread counts to measure.",
+    )
+    contention_parser.add_argument("--calls-per-thread", type=int, default=50, help="Sidecar calls per thread.")
+    contention_parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=2.0,
+        help="Simulated sidecar round-trip time; threads block on it without holding the GIL, like on a socket.",
+    )
+
+    return parser.parse_args()
+
+
+class _StubSidecarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY delayed ACKs dominate the timings.
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/Validate":
+            self._reply({"protocol": "Bearer", "token": "benchmark-token", "claims": {"oid": "00000000"}})
+        elif path.startswith("/AuthorizationHeader"):
+            self._reply({"authorizationHeader": "Bearer downstream-token"})
+        else:
+            self._reply({})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        decoded = _decompress(self.headers.get("Content-Encoding"), body)
+        json.loads(decoded or b"null")
+        with self.server.lock:  # type: ignore[attr-defined]
+            self.server.bytes_received += len(body)  # type: ignore[attr-defined]
+            self.server.bytes_decoded += len(decoded)  # type: ignore[attr-defined]
+        content = self.server.downstream_content  # type: ignore[attr-defined]
+        self._reply({"statusCode": 200, "headers": {}, "content": content}, compress=True)
+
+    def _reply(self, payload: Dict[str, Any], compress: bool = False) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        uncompressed_length = len(body)
+        # Like the sidecar, only /DownstreamApi responses are compressed, and only with an accepted encoding.
+        encoding = self.server.response_encoding if compress else None  # type: ignore[attr-defined]
+        if encoding and encoding not in (self.headers.get("Accept-Encoding") or ""):
+            encoding = None
+        if encoding:
+            body = _compress_response(encoding, body)
+        with self.server.lock:  # type: ignore[attr-defined]
+            self.server.calls += 1  # type: ignore[attr-defined]
+            self.server.bytes_sent += len(body)  # type: ignore[attr-defined]
+            self.server.bytes_sent_decoded += uncompressed_length  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _StubSidecarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+@contextmanager
+def stub_sidecar() -> Iterator[ThreadingHTTPServer]:
+    server = _StubSidecarServer(("127.0.0.1", 0), _StubSidecarHandler)
+    server.calls = 0  # type: ignore[attr-defined]
+    server.bytes_received = 0  # type: ignore[attr-defined]
+    server.bytes_decoded = 0  # type: ignore[attr-defined]
+    server.bytes_sent = 0  # type: ignore[attr-defined]
+    server.bytes_sent_decoded = 0  # type: ignore[attr-defined]
+    server.response_encoding = None  # type: ignore[attr-defined]
+    server.downstream_content = "{}"  # type: ignore[attr-defined]
+    server.lock = threading.Lock()  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _decompress(encoding: Optional[str], body: bytes) -> bytes:
+    if not encoding:
+        return body
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return brotli.decompress(body)
+    raise ValueError(f"Unsupported Content-Encoding '{encoding}'.")
+
+
+def _compress_response(encoding: str, body: bytes) -> bytes:
+    # Fastest levels, as ASP.NET Core's response compression providers use by default.
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=1)
+    if encoding == "br":
+        return brotli.compress(body, quality=1)
+    raise ValueError(f"Unsupported response encoding '{encoding}'.")
+
+
+def _sidecar_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}/"
+
+
+def _report(name: str, requests: int, elapsed: float, sidecar_calls: int) -> None:
+    print(
+        f"{name:<28} {requests / elapsed:>10.1f} req/s"
+        f" {elapsed / requests * 1000:>8.3f} ms/req"
+        f" {sidecar_calls / requests:>6.2f} sidecar calls/req"
+    )
+
+
+def _measure(server: ThreadingHTTPServer, name: str, requests: int, run: Callable[[], None]) -> None:
+    server.calls = 0  # type: ignore[attr-defined]
+    start = time.perf_counter()
+    run()
+    _report(name, requests, time.perf_counter() - start, server.calls)  # type: ignore[attr-defined]
+
+
+def run_middleware_benchmark(args: argparse.Namespace) -> None:
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/", "HTTP_AUTHORIZATION": AUTHORIZATION_HEADER}
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", AUTHORIZATION_HEADER.encode("latin-1"))],
+    }
+
+    def start_response(status: str, headers: List[Any]) -> None:
+        pass
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    with stub_sidecar() as server, MicrosoftIdentityWebSidecarClient(_sidecar_url(server)) as client:
+
+        def hand_written_app(environ: Dict[str, Any], start_response: Callable[..., Any]) -> List[bytes]:
+            client.validate_authorization_header(environ["HTTP_AUTHORIZATION"])
+            for _ in range(args.header_lookups):
+                client.get_authorization_header("downstream", environ["HTTP_AUTHORIZATION"])
+            start_response("200 OK", [])
+            return [b""]
+
+        def wsgi_app(environ: Dict[str, Any], start_response: Callable[..., Any]) -> List[bytes]:
+            context = environ[DEFAULT_CONTEXT_KEY]
+            for _ in range(args.header_lookups):
+                context.get_authorization_header("downstream")
+            start_response("200 OK", [])
+            return [b""]
+
+        async def asgi_app(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+            context = scope[DEFAULT_CONTEXT_KEY]
+            lookups = (context.get_authorization_header("downstream") for _ in range(args.header_lookups))
+            await asyncio.gather(*lookups)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        wsgi_middleware = SidecarWsgiMiddleware(wsgi_app, client)
+        asgi_middleware = SidecarAsgiMiddleware(asgi_app, client)
+
+        def run_hand_written() -> None:
+            for _ in range(args.requests):
+                hand_written_app(dict(environ), start_response)
+
+        def run_wsgi() -> None:
+            for _ in range(args.requests):
+                wsgi_middleware(dict(environ), start_response)
+
+        def run_asgi() -> None:
+            async def serve() -> None:
+                for _ in range(args.requests):
+                    await asgi_middleware(dict(scope), receive, send)
+
+            asyncio.run(serve())
+
+        _measure(server, "hand-written (no reuse)", args.requests, run_hand_written)
+        _measure(server, "SidecarWsgiMiddleware", args.requests, run_wsgi)
+        _measure(server, "SidecarAsgiMiddleware", args.requests, run_asgi)
+
+
+def _compression_row(encoding: Optional[str], json_bytes: float, wire_bytes: float, cpu_ms: float, rate: float) -> str:
+    return (
+        f"{encoding or 'identity':<10} {json_bytes:>11.0f} {wire_bytes:>11.0f} {json_bytes / wire_bytes:>7.2f}"
+        f" {cpu_ms:>14.3f} {rate:>9.1f}"
+    )
+
+
+def _timed_calls(requests: int, call: Callable[[], None]) -> Tuple[float, float]:
+    """Return the client CPU milliseconds per call and the calls per second."""
+
+    # thread_time only counts this thread: serialization, (de)compression and requests overhead, but not the
+    # stub sidecar's side of the work, which runs on its own threads.
+    cpu_start = time.thread_time()
+    start = time.perf_counter()
+    for _ in range(requests):
+        call()
+    elapsed = time.perf_counter() - start
+    return (time.thread_time() - cpu_start) / requests * 1000, requests / elapsed
+
+
+def run_compression_benchmark(args: argparse.Namespace) -> None:
+    body = {
+        "value": [
+            {
+                "id": f"{index:08d}-0000-0000-0000-000000000000",
+                "displayName": f"User {index}",
+                "mail": f"user{index}@contoso.com",
+                "jobTitle": "Engineer",
+                "officeLocation": f"Building {index % 40}",
+            }
+            for index in range(args.items)
+        ]
+    }
+    header = f"{'encoding':<10} {'JSON bytes':>11} {'wire bytes':>11} {'ratio':>7} {'client CPU ms':>14} {'req/s':>9}"
+
+    with stub_sidecar() as server:
+        print(f"Request bodies: {args.items} items, threshold {args.threshold} bytes")
+        print(header)
+        for encoding in (None,) + supported_request_compressions():
+            with MicrosoftIdentityWebSidecarClient(
+                _sidecar_url(server),
+                request_compression=encoding,
+                compression_threshold=args.threshold,
+            ) as client:
+                server.bytes_received = 0  # type: ignore[attr-defined]
+                server.bytes_decoded = 0  # type: ignore[attr-defined]
+                cpu_ms, rate = _timed_calls(
+                    args.requests,
+                    functools.partial(client.invoke_downstream_api_unauthenticated, "downstream", json_body=body),
+                )
+            json_bytes = server.bytes_decoded / args.requests  # type: ignore[attr-defined]
+            wire_bytes = server.bytes_received / args.requests  # type: ignore[attr-defined]
+            print(_compression_row(encoding, json_bytes, wire_bytes, cpu_ms, rate))
+
+        # The sidecar compresses /DownstreamApi responses with any encoding the client accepts; the client CPU
+        # column is then the cost of decoding them (urllib3 decodes as the body is read).
+        print(f"\nResponses: {args.items} items in the downstream content")
+        print(header)
+        server.downstream_content = json.dumps(body)  # type: ignore[attr-defined]
+        for encoding in (None,) + supported_request_compressions():
+            server.response_encoding = encoding  # type: ignore[attr-defined]
+            with MicrosoftIdentityWebSidecarClient(_sidecar_url(server)) as client:
+                server.bytes_sent = 0  # type: ignore[attr-defined]
+                server.bytes_sent_decoded = 0  # type: ignore[attr-defined]
+                cpu_ms, rate = _timed_calls(
+                    args.requests, functools.partial(client.invoke_downstream_api_unauthenticated, "downstream")
+                )
+            json_bytes = server.bytes_sent_decoded / args.requests  # type: ignore[attr-defined]
+            wire_bytes = server.bytes_sent / args.requests  # type: ignore[attr-defined]
+            print(_compression_row(encoding, json_bytes, wire_bytes, cpu_ms, rate))
+
+
+def _run_threads(thread_count: int, calls_per_thread: int, call: Callable[[], None]) -> float:
+    barrier = threading.Barrier(thread_count + 1)
+
+    def worker() -> None:
+        barrier.wait()
+        for _ in range(calls_per_thread):
+            call()
+
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+class _FakeSidecarAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that answers every request with a canned sidecar response after a fixed delay.
+
+    Unlike the stub HTTP server it cannot become the bottleneck, so the client's own overhead and lock contention
+    are what limit throughput as threads are added.
+    """
+
+    def __init__(self, latency: float) -> None:
+        super().__init__()
+        self._latency = latency
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if self._latency:
+            time.sleep(self._latency)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        if "/DownstreamApi" in (request.path_url or ""):
+            response._content = b'{"statusCode": 200, "headers": {}, "content": "{}"}'
+        else:
+            response._content = b'{"authorizationHeader": "Bearer downstream-token"}'
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def run_contention_benchmark(args: argparse.Namespace) -> None:
+    thread_counts = [int(value) for value in args.threads.split(",")]
+    latency = args.latency_ms / 1000
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled else 'disabled'}")
+    print(f"Simulated sidecar latency {args.latency_ms} ms; 'ideal' is threads / latency.")
+    print(
+        f"{'threads':>7} {'ideal':>10} {'sidecar':>10} {'efficiency':>10}"
+        f" {'cache 1 shard':>14} {'cache 16 shards':>16}  (calls/s)"
+    )
+
+    url = "http://sidecar.invalid"
+    cached_options = SidecarCallOptions(http_method="GET", relative_path="me")
+    sidecar_client = MicrosoftIdentityWebSidecarClient(url, adapter=_FakeSidecarAdapter(latency))
+    cache_clients = [
+        MicrosoftIdentityWebSidecarClient(
+            url,
+            adapter=_FakeSidecarAdapter(0),
+            response_cache=DownstreamApiResponseCache(shards=shards, default_ttl=3600),
+        )
+        for shards in (1, 16)
+    ]
+    with sidecar_client, cache_clients[0], cache_clients[1]:
+        sidecar_call = functools.partial(sidecar_client.get_authorization_header_unauthenticated, "downstream")
+        cache_calls = [
+            functools.partial(client.invoke_downstream_api_unauthenticated, "downstream", options=cached_options)
+            for client in cache_clients
+        ]
+        for call in cache_calls:
+            call()
+
+        for thread_count in thread_counts:
+            calls = thread_count * args.calls_per_thread
+            ideal = thread_count / latency if latency else float("inf")
+            sidecar_rate = calls / _run_threads(thread_count, args.calls_per_thread, sidecar_call)
+            cache_rates = [calls / _run_threads(thread_count, args.calls_per_thread, call) for call in cache_calls]
+            print(
+                f"{thread_count:>7} {ideal:>10.0f} {sidecar_rate:>10.0f} {sidecar_rate / ideal:>10.0%}"
+                f" {cache_rates[0]:>14.0f} {cache_rates[1]:>16.0f}"
+            )
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "middleware":
+        run_middleware_benchmark(args)
+    elif args.command == "compression":
+        run_compression_benchmark(args)
+    elif args.command == "contention":
+        run_contention_benchmark(args)
+    else:
+        raise SystemExit(f"Unsupported command: {args.command}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,643 @@
+import gzip
+import json
+import os
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Mapping, Optional
+from unittest import mock
+
+import requests
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+from MicrosoftIdentityWebSidecarClient import (
+    DownstreamApiResponseCache,
+    DownstreamApiResult,
+    MicrosoftIdentityWebSidecarClient,
+    SidecarCallOptions,
+    SidecarError,
+    _parse_page,
+    _to_relative_path,
+)
+
+
+class _FakeResponse:
+    def __init__(self, payload: Any, status_code: int = 200) -> None:
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class _FakeSession:
+    """Stands in for requests.Session; ``respond`` builds the sidecar payload for each call."""
+
+    def __init__(self, respond: Callable[[Dict[str, Any]], Any]) -> None:
+        self._respond = respond
+        self.calls: List[Dict[str, Any]] = []
+
+    def request(self, **kwargs: Any) -> _FakeResponse:
+        self.calls.append(kwargs)
+        return _FakeResponse(self._respond(kwargs))
+
+    def close(self) -> None:
+        pass
+
+
+def _downstream_payload(content: Any, headers: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    return {"statusCode": 200, "headers": dict(headers or {}), "content": content}
+
+
+def _result(headers: Mapping[str, Any], status_code: int = 200) -> DownstreamApiResult:
+    return DownstreamApiResult(status_code=status_code, headers=headers, content="{}")
+
+
+GET_ME = SidecarCallOptions(http_method="GET", relative_path="me")
+
+
+class FreshnessLifetimeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = DownstreamApiResponseCache(default_ttl=0)
+
+    def test_max_age_is_used(self) -> None:
+        self.assertEqual(self.cache._freshness_lifetime({"Cache-Control": ["public, max-age=120"]}), 120)
+
+    def test_header_names_are_case_insensitive(self) -> None:
+        self.assertEqual(self.cache._freshness_lifetime({"cache-control": "max-age=5"}), 5)
+
+    def test_no_store_and_no_cache_are_not_cached(self) -> None:
+        self.assertEqual(self.cache._freshness_lifetime({"Cache-Control": ["no-store"]}), 0)
+        self.assertEqual(self.cache._freshness_lifetime({"Cache-Control": ["no-cache", "max-age=60"]}), 0)
+
+    def test_expires_is_used_without_cache_control(self) -> None:
+        expires = format_datetime(datetime.now(timezone.utc) + timedelta(minutes=10), usegmt=True)
+        lifetime = self.cache._freshness_lifetime({"Expires": [expires]})
+        self.assertGreater(lifetime, 590)
+        self.assertLessEqual(lifetime, 600)
+
+    def test_invalid_expires_is_not_cached(self) -> None:
+        self.assertEqual(self.cache._freshness_lifetime({"Expires": ["0"]}), 0)
+
+    def test_no_freshness_information_defaults_to_not_cached(self) -> None:
+        cache = DownstreamApiResponseCache()
+        self.assertEqual(cache._freshness_lifetime({"Content-Type": ["application/json"]}), 0)
+
+    def test_default_ttl_opts_in_to_heuristic_caching(self) -> None:
+        cache = DownstreamApiResponseCache(default_ttl=30)
+        self.assertEqual(cache._freshness_lifetime({}), 30)
+        self.assertEqual(cache._freshness_lifetime({"Cache-Control": "no-store"}), 0)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_only_successful_results_are_stored(self) -> None:
+        cache = DownstreamApiResponseCache(default_ttl=60)
+        cache.put("ok", _result({}))
+        cache.put("not-found", _result({}, status_code=404))
+        self.assertIsNotNone(cache.get("ok"))
+        self.assertIsNone(cache.get("not-found"))
+
+    def test_expired_entries_are_dropped(self) -> None:
+        cache = DownstreamApiResponseCache()
+        cache.put("key", _result({"Cache-Control": "max-age=0.01"}))
+        self.assertIsNotNone(cache.get("key"))
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self) -> None:
+        cache = DownstreamApiResponseCache(max_entries=2, default_ttl=60)
+        cache.put("a", _result({}))
+        cache.put("b", _result({}))
+        cache.get("a")
+        cache.put("c", _result({}))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_capacity_is_max_entries_across_shards(self) -> None:
+        cache = DownstreamApiResponseCache(max_entries=4, default_ttl=60, shards=16)
+        for key in range(4):
+            cache.put(key, _result({}))
+        self.assertEqual(len(cache), 4)
+        self.assertTrue(all(cache.get(key) is not None for key in range(4)))
+
+        cache.put(4, _result({}))
+        self.assertEqual(len(cache), 4)
+        self.assertIsNone(cache.get(0))
+
+    def test_entries_below_capacity_are_kept(self) -> None:
+        cache = DownstreamApiResponseCache(max_entries=256, default_ttl=60)
+        for key in range(200):
+            cache.put(f"key-{key}", _result({}))
+        self.assertEqual(len(cache), 200)
+        self.assertTrue(all(cache.get(f"key-{key}") is not None for key in range(200)))
+
+    def test_concurrent_puts_never_exceed_capacity(self) -> None:
+        cache = DownstreamApiResponseCache(max_entries=64, default_ttl=60)
+
+        def fill(worker: int) -> None:
+            for key in range(500):
+                cache.put((worker, key), _result({}))
+
+        threads = [threading.Thread(target=fill, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(cache), 64)
+        self.assertEqual(sum(len(shard.entries) for shard in cache._shards), 64)
+
+
+class ClientResponseCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.counter = 0
+
+        def respond(call: Dict[str, Any]) -> Any:
+            self.counter += 1
+            return _downstream_payload(f"response {self.counter}")
+
+        self.session = _FakeSession(respond)
+        self.client = MicrosoftIdentityWebSidecarClient(
+            "http://sidecar",
+            session=self.session,
+            response_cache=DownstreamApiResponseCache(default_ttl=60),
+        )
+
+    def test_repeated_get_is_served_from_cache(self) -> None:
+        first = self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME)
+        second = self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.session.calls), 1)
+
+    def test_cache_is_keyed_by_caller(self) -> None:
+        first = self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME)
+        second = self.client.invoke_downstream_api("graph", "Bearer b", options=GET_ME)
+        self.assertNotEqual(first.content, second.content)
+
+    def test_cache_is_keyed_by_options_and_agent_identity(self) -> None:
+        self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME)
+        self.client.invoke_downstream_api(
+            "graph", "Bearer a", options=SidecarCallOptions(http_method="GET", relative_path="users")
+        )
+        self.client.invoke_downstream_api("graph", "Bearer a", agent_identity="agent", options=GET_ME)
+        self.assertEqual(len(self.session.calls), 3)
+
+    def test_non_get_and_body_calls_are_not_cached(self) -> None:
+        post = SidecarCallOptions(http_method="POST", relative_path="me")
+        self.client.invoke_downstream_api("graph", "Bearer a", options=post)
+        self.client.invoke_downstream_api("graph", "Bearer a", options=post)
+        self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME, json_body={"a": 1})
+        self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME, json_body={"a": 1})
+        self.assertEqual(len(self.session.calls), 4)
+
+    def test_default_authorization_identifies_unauthenticated_callers(self) -> None:
+        first = self.client.with_default_authorization("Bearer a").invoke_downstream_api_unauthenticated(
+            "graph", options=GET_ME
+        )
+        second = self.client.with_default_authorization("Bearer b").invoke_downstream_api_unauthenticated(
+            "graph", options=GET_ME
+        )
+        self.assertNotEqual(first.content, second.content)
+
+
+
+class RevalidationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.etag = '"v1"'
+        self.max_age = 0
+
+        def respond(call: Dict[str, Any]) -> Any:
+            headers = {"ETag": [self.etag], "Cache-Control": [f"max-age={self.max_age}"]}
+            if call["params"].get("optionsOverride.ExtraHeaderParameters.If-None-Match") == self.etag:
+                return {"statusCode": 304, "headers": headers, "content": None}
+            return {"statusCode": 200, "headers": headers, "content": f"body {self.etag}"}
+
+        self.session = _FakeSession(respond)
+        self.cache = DownstreamApiResponseCache()
+        self.client = MicrosoftIdentityWebSidecarClient(
+            "http://sidecar", session=self.session, response_cache=self.cache
+        )
+
+    def _call(self) -> DownstreamApiResult:
+        return self.client.invoke_downstream_api("graph", "Bearer a", options=GET_ME)
+
+    def test_stale_entry_with_etag_is_kept_for_revalidation(self) -> None:
+        self.cache.put("key", _result({"ETag": ['"v1"']}))
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.cache._lookup("key"), (_result({"ETag": ['"v1"']}), False))
+
+    def test_no_store_is_never_kept_even_with_etag(self) -> None:
+        self.cache.put("key", _result({"ETag": ['"v1"'], "Cache-Control": "no-store"}))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_not_modified_serves_cached_result_and_refreshes_freshness(self) -> None:
+        first = self._call()
+        self.max_age = 60
+        second = self._call()
+        third = self._call()
+
+        self.assertEqual(len(self.session.calls), 2)
+        self.assertNotIn("optionsOverride.ExtraHeaderParameters.If-None-Match", self.session.calls[0]["params"])
+        self.assertEqual(
+            self.session.calls[1]["params"]["optionsOverride.ExtraHeaderParameters.If-None-Match"], '"v1"'
+        )
+        self.assertEqual((second.status_code, second.content), (200, first.content))
+        self.assertEqual(second.headers["Cache-Control"], ["max-age=60"])
+        self.assertEqual(third, second)
+
+    def test_changed_resource_replaces_cached_result(self) -> None:
+        self._call()
+        self.etag = '"v2"'
+        second = self._call()
+        self.assertEqual(second.content, 'body "v2"')
+        self.assertEqual(self._call().content, 'body "v2"')
+        self.assertEqual(
+            self.session.calls[2]["params"]["optionsOverride.ExtraHeaderParameters.If-None-Match"], '"v2"'
+        )
+
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+
+
+def _graph_pages(page_count: int, items_per_page: int = 2) -> Callable[[Dict[str, Any]], Any]:
+    """Serve ``users?page=N`` pages linked through absolute @odata.nextLink URLs."""
+
+    def respond(call: Dict[str, Any]) -> Any:
+        relative_path = call["params"].get("optionsOverride.RelativePath", "users")
+        page = int(relative_path.partition("page=")[2] or 0)
+        body: Dict[str, Any] = {"value": [page * 100 + i for i in range(items_per_page)]}
+        if page + 1 < page_count:
+            body["@odata.nextLink"] = f"{GRAPH}/users?page={page + 1}"
+        return _downstream_payload(json.dumps(body))
+
+    return respond
+
+
+class PagingHelperTests(unittest.TestCase):
+    def test_absolute_next_link_is_made_relative(self) -> None:
+        self.assertEqual(_to_relative_path(f"{GRAPH}/users?$skiptoken=x", GRAPH + "/"), "users?$skiptoken=x")
+
+    def test_relative_next_link_is_kept(self) -> None:
+        self.assertEqual(_to_relative_path("users?page=2", GRAPH), "users?page=2")
+
+    def test_next_link_outside_base_url_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            _to_relative_path("https://contoso.com/v1.0/users?page=2", GRAPH)
+
+    def test_parse_page_accepts_json_text_and_objects(self) -> None:
+        self.assertEqual(_parse_page(_result_with_content('{"value": [1]}')), {"value": [1]})
+        self.assertEqual(_parse_page(_result_with_content({"value": [1]})), {"value": [1]})
+        self.assertEqual(_parse_page(_result_with_content(None)), {})
+
+    def test_parse_page_rejects_errors_and_non_objects(self) -> None:
+        with self.assertRaises(SidecarError):
+            _parse_page(_result_with_content("{}", status_code=404))
+        with self.assertRaises(SidecarError):
+            _parse_page(_result_with_content("not json"))
+        with self.assertRaises(SidecarError):
+            _parse_page(_result_with_content("[1, 2]"))
+
+
+def _result_with_content(content: Any, status_code: int = 200) -> DownstreamApiResult:
+    return DownstreamApiResult(status_code=status_code, headers={}, content=content)
+
+
+class PagingIteratorTests(unittest.TestCase):
+    def _client(self, respond: Callable[[Dict[str, Any]], Any]) -> MicrosoftIdentityWebSidecarClient:
+        self.session = _FakeSession(respond)
+        return MicrosoftIdentityWebSidecarClient("http://sidecar", session=self.session)
+
+    def test_items_are_yielded_across_pages(self) -> None:
+        client = self._client(_graph_pages(3))
+        items = list(
+            client.iter_downstream_api_items(
+                "graph", "Bearer a", downstream_base_url=GRAPH, options=SidecarCallOptions(relative_path="users")
+            )
+        )
+        self.assertEqual(items, [0, 1, 100, 101, 200, 201])
+        self.assertEqual(len(self.session.calls), 3)
+
+    def test_non_advancing_next_link_raises_without_duplicates(self) -> None:
+        # The sidecar ignores RelativePath overrides, so every call returns the first page again.
+        def respond(call: Dict[str, Any]) -> Any:
+            return _downstream_payload(json.dumps({"value": [1, 2], "@odata.nextLink": f"{GRAPH}/users?page=1"}))
+
+        client = self._client(respond)
+        items: List[Any] = []
+        with self.assertRaises(SidecarError):
+            for item in client.iter_downstream_api_items_unauthenticated("graph", downstream_base_url=GRAPH):
+                items.append(item)
+        self.assertEqual(items, [1, 2])
+
+    def test_missing_base_url_fails_before_fetching(self) -> None:
+        client = self._client(_graph_pages(2))
+        with self.assertRaises(ValueError):
+            client.iter_downstream_api_items("graph", "Bearer a", downstream_base_url="")
+        self.assertEqual(self.session.calls, [])
+
+    def test_prefetch_is_bounded_by_max_buffered_pages(self) -> None:
+        client = self._client(_graph_pages(10))
+        items = client.iter_downstream_api_items("graph", "Bearer a", downstream_base_url=GRAPH, max_buffered_pages=1)
+        next(items)
+        time.sleep(0.2)
+        # The page being consumed plus one prefetched page.
+        self.assertEqual(len(self.session.calls), 2)
+        items.close()
+
+    def test_errors_are_raised_in_the_consumer(self) -> None:
+        def respond(call: Dict[str, Any]) -> Any:
+            if "optionsOverride.RelativePath" in call["params"]:
+                return {"statusCode": 503, "headers": {}, "content": None}
+            return _graph_pages(5)(call)
+
+        client = self._client(respond)
+        items: List[Any] = []
+        with self.assertRaises(SidecarError) as raised:
+            for item in client.iter_downstream_api_items("graph", "Bearer a", downstream_base_url=GRAPH):
+                items.append(item)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(items, [0, 1])
+
+    def test_closing_the_iterator_stops_the_producer(self) -> None:
+        client = self._client(_graph_pages(1000))
+        items = client.iter_downstream_api_items("graph", "Bearer a", downstream_base_url=GRAPH)
+        next(items)
+        items.close()
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and any(t.name == "sidecar-page-prefetch" for t in threading.enumerate()):
+            time.sleep(0.05)
+        self.assertFalse(any(t.name == "sidecar-page-prefetch" for t in threading.enumerate()))
+        self.assertLess(len(self.session.calls), 5)
+
+
+class RequestCompressionTests(unittest.TestCase):
+    def _send(self, body: Any, **client_options: Any) -> Dict[str, Any]:
+        session = _FakeSession(lambda call: _downstream_payload(None))
+        client = MicrosoftIdentityWebSidecarClient("http://sidecar", session=session, **client_options)
+        client.invoke_downstream_api("graph", "Bearer a", json_body=body)
+        return session.calls[0]
+
+    def test_bodies_are_sent_as_compact_json(self) -> None:
+        call = self._send({"a": [1, 2]})
+        self.assertEqual(call["data"], b'{"a":[1,2]}')
+        self.assertEqual(call["headers"]["Content-Type"], "application/json")
+        self.assertNotIn("Content-Encoding", call["headers"])
+
+    def test_bodies_below_threshold_are_not_compressed(self) -> None:
+        call = self._send({"a": 1}, request_compression="gzip", compression_threshold=1024)
+        self.assertEqual(call["data"], b'{"a":1}')
+        self.assertNotIn("Content-Encoding", call["headers"])
+
+    def test_large_bodies_are_compressed(self) -> None:
+        body = {"value": ["item"] * 500}
+        call = self._send(body, request_compression="gzip", compression_threshold=1024)
+        self.assertEqual(call["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(call["data"])), body)
+
+    def test_unsupported_encoding_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            MicrosoftIdentityWebSidecarClient("http://sidecar", request_compression="zstd")
+
+
+class _RecordingAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that records which session sent each request and answers with an empty JSON object."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sessions: List[str] = []
+        self._lock = threading.Lock()
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        with self._lock:
+            self.sessions.append(request.headers["X-Session"])  # type: ignore[arg-type]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"authorizationHeader": "Bearer downstream"}'
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class SessionTests(unittest.TestCase):
+    def test_each_thread_gets_its_own_session_over_the_shared_adapter(self) -> None:
+        adapter = _RecordingAdapter()
+        client = MicrosoftIdentityWebSidecarClient("http://sidecar", adapter=adapter)
+
+        def call() -> None:
+            session = client._sessions.current()
+            self.assertIs(session.get_adapter("http://sidecar/"), adapter)
+            session.headers["X-Session"] = str(id(session))
+            for _ in range(3):
+                client.get_authorization_header_unauthenticated("graph")
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(adapter.sessions), 12)
+        self.assertEqual(len(set(adapter.sessions)), 4)
+
+    def test_derived_clients_share_the_connection_pool(self) -> None:
+        client = MicrosoftIdentityWebSidecarClient("http://sidecar", post_fork_warm_up_connections=2)
+        with mock.patch.object(requests.adapters, "HTTPAdapter", side_effect=AssertionError("new pool")):
+            derived = client.with_default_authorization("Bearer a")
+        self.assertIs(derived._sessions, client._sessions)
+        self.assertEqual(derived._default_headers, {"Authorization": "Bearer a"})
+        self.assertEqual(client._default_headers, {})
+        self.assertEqual(derived._post_fork_warm_up_connections, 0)
+        derived.close()
+        self.assertTrue(client._owns_session)
+
+    def test_pool_block_is_passed_to_the_adapter(self) -> None:
+        client = MicrosoftIdentityWebSidecarClient("http://sidecar", pool_maxsize=200, pool_block=True)
+        adapter = client._sessions.adapters()[0]
+        self.assertEqual((adapter._pool_maxsize, adapter._pool_block), (200, True))
+
+    def test_supplied_session_does_not_create_a_pool(self) -> None:
+        session = requests.Session()
+        with mock.patch.object(requests.adapters, "HTTPAdapter", side_effect=AssertionError("new pool")):
+            MicrosoftIdentityWebSidecarClient("http://sidecar", session=session)
+
+    def test_session_and_adapter_are_mutually_exclusive(self) -> None:
+        with self.assertRaises(ValueError):
+            MicrosoftIdentityWebSidecarClient(
+                "http://sidecar", session=requests.Session(), adapter=_RecordingAdapter()
+            )
+
+
+class _SidecarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self._reply(b'{"authorizationHeader": "Bearer downstream"}')
+
+    def do_POST(self) -> None:
+        # Compress /DownstreamApi responses like the sidecar does, with the encoding chosen by the test.
+        payload = json.dumps(_downstream_payload(DOWNSTREAM_CONTENT)).encode("utf-8")
+        encoding = self.server.response_encoding  # type: ignore[attr-defined]
+        if encoding not in (self.headers.get("Accept-Encoding") or ""):
+            self.send_error(406)
+            return
+        self._reply(gzip.compress(payload) if encoding == "gzip" else brotli.compress(payload), encoding)
+
+    def _reply(self, body: bytes, encoding: Optional[str] = None) -> None:
+        with self.server.lock:  # type: ignore[attr-defined]
+            self.server.paths.append(self.path.split("?", 1)[0])  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _LocalSidecar:
+    """Loopback HTTP server that records the path of every request it serves."""
+
+    def __enter__(self) -> "_LocalSidecar":
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _SidecarHandler)
+        self.server.daemon_threads = True
+        self.server.response_encoding = "gzip"  # type: ignore[attr-defined]
+        self.server.paths = []  # type: ignore[attr-defined]
+        self.server.lock = threading.Lock()  # type: ignore[attr-defined]
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, path: str) -> int:
+        with self.server.lock:  # type: ignore[attr-defined]
+            return self.server.paths.count(path)  # type: ignore[attr-defined]
+
+
+DOWNSTREAM_CONTENT = json.dumps({"value": [{"id": index, "displayName": f"User {index}"} for index in range(200)]})
+
+
+class ResponseDecompressionTests(unittest.TestCase):
+    def _invoke(self, encoding: str) -> DownstreamApiResult:
+        with _LocalSidecar() as sidecar:
+            sidecar.server.response_encoding = encoding  # type: ignore[attr-defined]
+            with MicrosoftIdentityWebSidecarClient(sidecar.url) as client:
+                return client.invoke_downstream_api_unauthenticated("graph")
+
+    def test_gzip_response_is_decoded(self) -> None:
+        self.assertEqual(self._invoke("gzip").content, DOWNSTREAM_CONTENT)
+
+    @unittest.skipIf(brotli is None, "requires brotli")
+    def test_br_response_is_decoded(self) -> None:
+        self.assertEqual(self._invoke("br").content, DOWNSTREAM_CONTENT)
+
+
+class _SessionNotToShare(requests.Session):
+    def request(self, *args: Any, **kwargs: Any) -> Any:  # type: ignore[override]
+        raise AssertionError("warm-up probes must not use the caller's session")
+
+
+class WarmUpTests(unittest.TestCase):
+    def test_warm_up_probes_health_endpoint(self) -> None:
+        with _LocalSidecar() as sidecar:
+            with MicrosoftIdentityWebSidecarClient(sidecar.url) as client:
+                client.warm_up(3)
+                pools = client._sessions.adapters()[0].poolmanager.pools
+                pooled = [
+                    connection
+                    for key in pools.keys()
+                    for connection in pools[key].pool.queue
+                    if connection is not None
+                ]
+            self.assertEqual(sidecar.count("/healthz"), 3)
+            self.assertGreaterEqual(len(pooled), 1)
+
+    def test_warm_up_does_not_share_a_supplied_session_across_probe_threads(self) -> None:
+        with _LocalSidecar() as sidecar:
+            client = MicrosoftIdentityWebSidecarClient(sidecar.url, session=_SessionNotToShare())
+            client.warm_up(3)
+            self.assertEqual(sidecar.count("/healthz"), 3)
+
+
+@unittest.skipUnless(hasattr(os, "register_at_fork") and hasattr(os, "fork"), "requires os.register_at_fork")
+class ForkTests(unittest.TestCase):
+    def test_child_gets_fresh_pools_and_keeps_cache_entries(self) -> None:
+        with _LocalSidecar() as sidecar:
+            cache = DownstreamApiResponseCache(default_ttl=60)
+            cache.put("key", _result({}))
+            client = MicrosoftIdentityWebSidecarClient(
+                sidecar.url, response_cache=cache, post_fork_warm_up_connections=2
+            )
+            derived = client.with_default_authorization("Bearer a")
+            client.get_authorization_header_unauthenticated("graph")
+
+            adapter = client._sessions.adapters()[0]
+            parent_poolmanager = adapter.poolmanager
+            parent_locks = [cache._size_lock] + [shard.lock for shard in cache._shards]
+            resets: List[int] = []
+            init_poolmanager = adapter.init_poolmanager
+
+            def counting_init_poolmanager(*args: Any, **kwargs: Any) -> None:
+                resets.append(1)
+                init_poolmanager(*args, **kwargs)
+
+            adapter.init_poolmanager = counting_init_poolmanager  # type: ignore[method-assign]
+
+            read_end, write_end = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    os.close(read_end)
+                    report = {
+                        "fresh_poolmanager": adapter.poolmanager is not parent_poolmanager,
+                        "resets": len(resets),
+                        "entry_kept": cache.get("key") is not None,
+                        "fresh_locks": all(
+                            lock is not old
+                            for lock, old in zip([cache._size_lock] + [s.lock for s in cache._shards], parent_locks)
+                        ),
+                        "call": derived.get_authorization_header_unauthenticated("graph").authorization_header,
+                    }
+                    for thread in threading.enumerate():
+                        if thread.name == "sidecar-post-fork-warm-up":
+                            thread.join(timeout=10)
+                    os.write(write_end, json.dumps(report).encode("utf-8"))
+                finally:
+                    os._exit(0)
+
+            os.close(write_end)
+            with os.fdopen(read_end, "rb") as reader:
+                report = json.loads(reader.read() or b"{}")
+            os.waitpid(pid, 0)
+            adapter.init_poolmanager = init_poolmanager  # type: ignore[method-assign]
+
+            self.assertEqual(
+                report,
+                {
+                    "fresh_poolmanager": True,
+                    "resets": 1,
+                    "entry_kept": True,
+                    "fresh_locks": True,
+                    "call": "Bearer downstream",
+                },
+            )
+            self.assertIs(adapter.poolmanager, parent_poolmanager)
+            self.assertEqual(sidecar.count("/healthz"), 2)
+            self.assertEqual(sidecar.count("/AuthorizationHeaderUnauthenticated/graph"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
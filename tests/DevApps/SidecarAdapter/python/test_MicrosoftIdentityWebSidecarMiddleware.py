@@ -0,0 +1,215 @@
+import asyncio
+import json
+import unittest
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from MicrosoftIdentityWebSidecarClient import (
+    AuthorizationHeaderResult,
+    MicrosoftIdentityWebSidecarClient,
+    SidecarError,
+    ValidateAuthorizationHeaderResult,
+)
+from MicrosoftIdentityWebSidecarMiddleware import (
+    DEFAULT_CONTEXT_KEY,
+    AsyncSidecarRequestContext,
+    SidecarAsgiMiddleware,
+    SidecarRequestContext,
+    SidecarWsgiMiddleware,
+)
+
+
+VALIDATION = ValidateAuthorizationHeaderResult(protocol="Bearer", token="token", claims={"oid": "1"})
+
+
+class _FakeClient(MicrosoftIdentityWebSidecarClient):
+    """Scripted client: each call pops the next outcome (a result or an exception to raise)."""
+
+    def __init__(self, validate: Any = VALIDATION, headers: Optional[List[Any]] = None) -> None:
+        super().__init__("http://sidecar")
+        self._validate = validate
+        self._headers = list(headers or [])
+        self.header_calls = 0
+
+    def validate_authorization_header(self, authorization_header: str) -> ValidateAuthorizationHeaderResult:
+        if isinstance(self._validate, Exception):
+            raise self._validate
+        return self._validate
+
+    def get_authorization_header(
+        self, api_name: str, authorization_header: str, **kwargs: Any
+    ) -> AuthorizationHeaderResult:
+        self.header_calls += 1
+        outcome = self._headers.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+DOWNSTREAM = AuthorizationHeaderResult(authorization_header="Bearer downstream")
+
+
+def _call_wsgi(middleware: SidecarWsgiMiddleware, environ: Dict[str, Any]) -> Dict[str, Any]:
+    captured: Dict[str, Any] = {}
+
+    def start_response(status: str, headers: List[Any]) -> None:
+        captured["status"] = status
+        captured["headers"] = dict(headers)
+
+    captured["body"] = b"".join(middleware(environ, start_response))
+    return captured
+
+
+def _call_asgi(middleware: SidecarAsgiMiddleware, headers: List[Any]) -> Dict[str, Any]:
+    messages = _run_asgi(middleware, {"type": "http", "headers": headers})
+    return {"status": messages[0]["status"], "body": messages[1]["body"]}
+
+
+def _run_asgi(middleware: SidecarAsgiMiddleware, scope: Dict[str, Any]) -> List[Dict[str, Any]]:
+    messages: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        if scope["type"] == "websocket":
+            return {"type": "websocket.connect"}
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+def _ok_wsgi_app(environ: Dict[str, Any], start_response: Any) -> List[bytes]:
+    start_response("200 OK", [])
+    return [b"ok"]
+
+
+async def _ok_asgi_app(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+    if scope["type"] == "websocket":
+        await send({"type": "websocket.accept"})
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+class MiddlewareErrorTests(unittest.TestCase):
+    def assert_problem(self, status: int, body: bytes, leaked: str = "internal") -> None:
+        problem = json.loads(body)
+        self.assertEqual(problem["status"], status)
+        self.assertNotIn(leaked, problem["detail"])
+
+    def test_missing_header_is_unauthorized(self) -> None:
+        response = _call_wsgi(SidecarWsgiMiddleware(_ok_wsgi_app, _FakeClient()), {})
+        self.assertTrue(response["status"].startswith("401"))
+        self.assertEqual(response["headers"]["WWW-Authenticate"], "Bearer")
+
+    def test_rejected_header_is_unauthorized(self) -> None:
+        client = _FakeClient(validate=SidecarError(401, "internal: signature invalid"))
+        response = _call_wsgi(SidecarWsgiMiddleware(_ok_wsgi_app, client), {"HTTP_AUTHORIZATION": "Bearer x"})
+        self.assertTrue(response["status"].startswith("401"))
+        self.assert_problem(401, response["body"])
+
+    def test_sidecar_failures_are_bad_gateway_without_details(self) -> None:
+        for error in (SidecarError(500, "internal error"), SidecarError(403, "internal: loopback only")):
+            client = _FakeClient(validate=error)
+            with self.assertLogs("MicrosoftIdentityWebSidecarMiddleware", "WARNING"):
+                response = _call_wsgi(
+                    SidecarWsgiMiddleware(_ok_wsgi_app, client), {"HTTP_AUTHORIZATION": "Bearer x"}
+                )
+            self.assertTrue(response["status"].startswith("502"))
+            self.assert_problem(502, response["body"])
+
+    def test_transport_failures_are_bad_gateway(self) -> None:
+        client = _FakeClient(validate=requests.ConnectionError("internal: connection refused"))
+        with self.assertLogs("MicrosoftIdentityWebSidecarMiddleware", "WARNING"):
+            response = _call_asgi(SidecarAsgiMiddleware(_ok_asgi_app, client), [(b"authorization", b"Bearer x")])
+        self.assertEqual(response["status"], 502)
+        self.assert_problem(502, response["body"])
+
+    def test_valid_header_reaches_the_app(self) -> None:
+        environ: Dict[str, Any] = {"HTTP_AUTHORIZATION": "Bearer x"}
+        response = _call_wsgi(SidecarWsgiMiddleware(_ok_wsgi_app, _FakeClient()), environ)
+        self.assertEqual(response["body"], b"ok")
+        self.assertEqual(environ[DEFAULT_CONTEXT_KEY].claims, {"oid": "1"})
+
+
+class WebSocketTests(unittest.TestCase):
+    def test_websocket_without_header_is_denied(self) -> None:
+        scope: Dict[str, Any] = {"type": "websocket", "headers": []}
+        messages = _run_asgi(SidecarAsgiMiddleware(_ok_asgi_app, _FakeClient()), scope)
+        self.assertEqual([message["type"] for message in messages], ["websocket.close"])
+        self.assertEqual(messages[0]["code"], 1008)
+        self.assertNotIn(DEFAULT_CONTEXT_KEY, scope)
+
+    def test_websocket_denial_uses_http_response_extension_when_available(self) -> None:
+        client = _FakeClient(validate=SidecarError(401, "internal: signature invalid"))
+        scope: Dict[str, Any] = {
+            "type": "websocket",
+            "headers": [(b"authorization", b"Bearer x")],
+            "extensions": {"websocket.http.response": {}},
+        }
+        messages = _run_asgi(SidecarAsgiMiddleware(_ok_asgi_app, client), scope)
+        self.assertEqual(messages[0]["type"], "websocket.http.response.start")
+        self.assertEqual(messages[0]["status"], 401)
+        self.assertEqual(json.loads(messages[1]["body"])["status"], 401)
+
+    def test_valid_websocket_reaches_the_app(self) -> None:
+        scope: Dict[str, Any] = {"type": "websocket", "headers": [(b"authorization", b"Bearer x")]}
+        messages = _run_asgi(SidecarAsgiMiddleware(_ok_asgi_app, _FakeClient()), scope)
+        self.assertEqual(messages, [{"type": "websocket.accept"}])
+        self.assertEqual(scope[DEFAULT_CONTEXT_KEY].claims, {"oid": "1"})
+
+    def test_lifespan_is_passed_through(self) -> None:
+        seen: List[str] = []
+
+        async def app(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+            seen.append(scope["type"])
+
+        middleware = SidecarAsgiMiddleware(app, _FakeClient())
+        asyncio.run(middleware({"type": "lifespan"}, None, None))  # type: ignore[arg-type]
+        self.assertEqual(seen, ["lifespan"])
+
+
+class RequestContextTests(unittest.TestCase):
+    def test_successful_lookups_are_memoized(self) -> None:
+        client = _FakeClient(headers=[DOWNSTREAM])
+        context = SidecarRequestContext(client, "Bearer x", VALIDATION)
+        self.assertEqual(context.get_authorization_header("graph"), DOWNSTREAM)
+        self.assertEqual(context.get_authorization_header("graph"), DOWNSTREAM)
+        self.assertEqual(client.header_calls, 1)
+
+    def test_failed_lookups_are_retried(self) -> None:
+        client = _FakeClient(headers=[requests.ConnectionError("down"), DOWNSTREAM])
+        context = SidecarRequestContext(client, "Bearer x", VALIDATION)
+        with self.assertRaises(requests.ConnectionError):
+            context.get_authorization_header("graph")
+        self.assertEqual(context.get_authorization_header("graph"), DOWNSTREAM)
+        self.assertEqual(client.header_calls, 2)
+
+    def test_async_failed_lookups_are_retried(self) -> None:
+        client = _FakeClient(headers=[requests.ConnectionError("down"), DOWNSTREAM])
+        context = AsyncSidecarRequestContext(client, "Bearer x", VALIDATION)
+
+        async def lookups() -> AuthorizationHeaderResult:
+            with self.assertRaises(requests.ConnectionError):
+                await context.get_authorization_header("graph")
+            return await context.get_authorization_header("graph")
+
+        self.assertEqual(asyncio.run(lookups()), DOWNSTREAM)
+        self.assertEqual(client.header_calls, 2)
+
+    def test_async_concurrent_lookups_share_one_call(self) -> None:
+        client = _FakeClient(headers=[DOWNSTREAM])
+        context = AsyncSidecarRequestContext(client, "Bearer x", VALIDATION)
+
+        async def lookups() -> List[AuthorizationHeaderResult]:
+            return await asyncio.gather(*(context.get_authorization_header("graph") for _ in range(3)))
+
+        self.assertEqual(asyncio.run(lookups()), [DOWNSTREAM] * 3)
+        self.assertEqual(client.header_calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
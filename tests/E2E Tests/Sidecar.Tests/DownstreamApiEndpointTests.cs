@@ -1,6 +1,7 @@
 // Copyright (c) Microsoft Corporation. All rights reserved.
 // Licensed under the MIT License.
 
+using System.IO.Compression;
 using System.Net;
 using System.Net.Http.Headers;
 using System.Net.Http.Json;
@@ -776,4 +777,154 @@ public class DownstreamApiEndpointTests(SidecarApiFactory factory) : IClassFixtu
         Assert.Equal("query-val", capturedOptions.ExtraQueryParameters["qparam"]);
     }
 
+    [Fact]
+    public async Task DownstreamApi_WithGzipRequestBody_PassesDecompressedContentAsync()
+    {
+        // Arrange
+        var requestBody = "{\"request\": \"value\"}";
+        using var compressed = new MemoryStream();
+        using (var gzip = new GZipStream(compressed, CompressionMode.Compress, leaveOpen: true))
+        {
+            await gzip.WriteAsync(Encoding.UTF8.GetBytes(requestBody));
+        }
+
+        var requestContent = new ByteArrayContent(compressed.ToArray());
+        requestContent.Headers.ContentType = new MediaTypeHeaderValue("application/json");
+        requestContent.Headers.ContentEncoding.Add("gzip");
+
+        var mockResponse = new HttpResponseMessage(HttpStatusCode.OK)
+        {
+            Content = new StringContent("{\"result\": \"success\"}", Encoding.UTF8, "application/json")
+        };
+
+        string? capturedBody = null;
+        var mockDownstreamApi = new Mock<IDownstreamApi>();
+        mockDownstreamApi
+            .Setup(x => x.CallApiAsync(It.IsAny<DownstreamApiOptions>(), It.IsAny<System.Security.Claims.ClaimsPrincipal>(), It.IsAny<HttpContent>(), It.IsAny<CancellationToken>()))
+            .Callback<DownstreamApiOptions, System.Security.Claims.ClaimsPrincipal, HttpContent?, CancellationToken>((_, _, content, _) =>
+            {
+                capturedBody = content?.ReadAsStringAsync().GetAwaiter().GetResult();
+            })
+            .ReturnsAsync(mockResponse);
+
+        var client = _factory.WithWebHostBuilder(builder =>
+        {
+            builder.ConfigureServices(services =>
+            {
+                TestAuthenticationHandler.AddAlwaysSucceedTestAuthentication(services);
+
+                services.Configure<DownstreamApiOptions>("test-api", options =>
+                {
+                    options.BaseUrl = "https://api.example.com";
+                    options.Scopes = ["user.read"];
+                });
+
+                services.AddSingleton(mockDownstreamApi.Object);
+            });
+        }).CreateClient();
+
+        client.DefaultRequestHeaders.Authorization = new AuthenticationHeaderValue("Bearer", "valid-token");
+
+        // Act
+        var response = await client.PostAsync("/DownstreamApi/test-api", requestContent);
+
+        // Assert
+        Assert.Equal(HttpStatusCode.OK, response.StatusCode);
+        Assert.Equal(requestBody, capturedBody);
+    }
+
+    [Fact]
+    public async Task DownstreamApi_WithAcceptEncodingGzip_CompressesResponseAsync()
+    {
+        // Arrange
+        var mockResponse = new HttpResponseMessage(HttpStatusCode.OK)
+        {
+            Content = new StringContent("{\"result\": \"success\"}", Encoding.UTF8, "application/json")
+        };
+
+        var mockDownstreamApi = new Mock<IDownstreamApi>();
+        mockDownstreamApi
+            .Setup(x => x.CallApiAsync(It.IsAny<DownstreamApiOptions>(), It.IsAny<System.Security.Claims.ClaimsPrincipal>(), It.IsAny<HttpContent>(), It.IsAny<CancellationToken>()))
+            .ReturnsAsync(mockResponse);
+
+        var client = _factory.WithWebHostBuilder(builder =>
+        {
+            builder.ConfigureServices(services =>
+            {
+                TestAuthenticationHandler.AddAlwaysSucceedTestAuthentication(services);
+
+                services.Configure<DownstreamApiOptions>("test-api", options =>
+                {
+                    options.BaseUrl = "https://api.example.com";
+                    options.Scopes = ["user.read"];
+                });
+
+                services.AddSingleton(mockDownstreamApi.Object);
+            });
+        }).CreateClient();
+
+        client.DefaultRequestHeaders.Authorization = new AuthenticationHeaderValue("Bearer", "valid-token");
+        client.DefaultRequestHeaders.AcceptEncoding.Add(new StringWithQualityHeaderValue("gzip"));
+
+        // Act
+        var response = await client.PostAsync("/DownstreamApi/test-api", null);
+
+        // Assert
+        Assert.Equal(HttpStatusCode.OK, response.StatusCode);
+        Assert.Contains("gzip", response.Content.Headers.ContentEncoding);
+    }
+
+    [Fact]
+    public async Task DownstreamApi_WithETagAndCacheControl_RelaysValidatorsAsync()
+    {
+        // Arrange
+        var mockResponse = new HttpResponseMessage(HttpStatusCode.NotModified)
+        {
+            Content = new StringContent(string.Empty)
+        };
+        mockResponse.Headers.ETag = new EntityTagHeaderValue("\"v1\"");
+        mockResponse.Headers.CacheControl = new CacheControlHeaderValue { MaxAge = TimeSpan.FromSeconds(60) };
+        mockResponse.Headers.Add("X-Not-Relayed", "value");
+
+        DownstreamApiOptions? capturedOptions = null;
+        var mockDownstreamApi = new Mock<IDownstreamApi>();
+        mockDownstreamApi
+            .Setup(x => x.CallApiAsync(It.IsAny<DownstreamApiOptions>(), It.IsAny<System.Security.Claims.ClaimsPrincipal>(), It.IsAny<HttpContent>(), It.IsAny<CancellationToken>()))
+            .Callback<DownstreamApiOptions, System.Security.Claims.ClaimsPrincipal, HttpContent?, CancellationToken>((options, _, _, _) =>
+            {
+                capturedOptions = options;
+            })
+            .ReturnsAsync(mockResponse);
+
+        var client = _factory.WithWebHostBuilder(builder =>
+        {
+            builder.ConfigureServices(services =>
+            {
+                TestAuthenticationHandler.AddAlwaysSucceedTestAuthentication(services);
+
+                services.Configure<DownstreamApiOptions>("test-api", options =>
+                {
+                    options.BaseUrl = "https://api.example.com";
+                    options.Scopes = ["user.read"];
+                });
+
+                services.AddSingleton(mockDownstreamApi.Object);
+            });
+        }).CreateClient();
+
+        client.DefaultRequestHeaders.Authorization = new AuthenticationHeaderValue("Bearer", "valid-token");
+
+        // Act
+        var response = await client.PostAsync("/DownstreamApi/test-api?optionsOverride.ExtraHeaderParameters.If-None-Match=%22v1%22", null);
+
+        // Assert
+        Assert.Equal(HttpStatusCode.OK, response.StatusCode);
+        Assert.Equal("\"v1\"", capturedOptions?.ExtraHeaderParameters?["If-None-Match"]);
+        var result = await response.Content.ReadFromJsonAsync<DownstreamApiResult>();
+        Assert.NotNull(result);
+        Assert.Equal(304, result.StatusCode);
+        Assert.Equal(["\"v1\""], result.Headers["ETag"]);
+        Assert.Equal(["max-age=60"], result.Headers["Cache-Control"]);
+        Assert.False(result.Headers.ContainsKey("X-Not-Relayed"));
+    }
 }